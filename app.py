@@ -1,13 +1,15 @@
 import streamlit as st
 import os
-import shutil
+import tempfile
 import json
 import pandas as pd
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import itertools
+import aiohttp
 from urllib.parse import urlparse
 from datetime import datetime
-from scraper import fetch_html, extract_menu_data, process_menu_data, download_image, merge_data
+from scraper import fetch_html, extract_menu_data, process_menu_data, download_image_async, merge_data, make_unique_names, save_excel, make_zip, UNSAFE_FILENAME_CHARS
 
 st.set_page_config(page_title="Menu Scraper", layout="wide")
 
@@ -38,6 +40,11 @@ with st.sidebar:
 
 url_input = st.text_input("Enter Restaurant URL (English or Arabic)", placeholder="https://www.your-restaurant-url.com/...")
 
+@st.cache_data(ttl=3600, max_entries=8, show_spinner=False)
+def _cached_fetch(url):
+    """Fetches a page, serving repeat scrapes of the same URL from Streamlit's (bounded) cache."""
+    return fetch_html(url)
+
 def run_scraper():
     if not url_input:
         st.error("Please enter a URL.")
@@ -103,108 +110,158 @@ def run_scraper():
         log_container.code("\n".join(st.session_state.logs), language="text")
         metric_time.metric("Elapsed Time", f"{int(time.time() - start_time)}s")
 
-    data_en, data_ar = [], []
-    
-    # 1. Scrape English
-    if scrape_en:
-        log("Fetching English Menu...")
-        try:
-            html_en = fetch_html(url_en)
-            json_en = extract_menu_data(html_en)
-            if json_en:
-                data_en = process_menu_data(json_en)
-                log(f"Found {len(data_en)} items in English menu.")
-            else:
-                log("WARNING: Could not extract English menu data.")
-        except Exception as e:
-            log(f"ERROR fetching English URL: {e}")
-            
-    progress_bar.progress(30)
-    
-    # 2. Scrape Arabic
-    if scrape_ar:
-        log("Fetching Arabic Menu...")
+    current_progress = 0
+
+    def set_progress(value):
+        # Phases overlap, so only ever move the bar forward
+        nonlocal current_progress
+        current_progress = max(current_progress, value)
+        progress_bar.progress(current_progress)
+
+    # 1. Fetch and parse a language; the blocking (cached) page fetch runs off the event loop
+    async def fetch_menu(url, label):
+        log(f"Fetching {label} Menu...")
         try:
-            html_ar = fetch_html(url_ar)
-            json_ar = extract_menu_data(html_ar)
-            if json_ar:
-                data_ar = process_menu_data(json_ar)
-                log(f"Found {len(data_ar)} items in Arabic menu.")
-            else:
-                log("WARNING: Could not extract Arabic menu data.")
+            html = await asyncio.to_thread(_cached_fetch, url)
+            json_data = extract_menu_data(html)
+            if json_data:
+                items = process_menu_data(json_data)
+                log(f"Found {len(items)} items in {label} menu.")
+                return items
+            log(f"WARNING: Could not extract {label} menu data.")
         except Exception as e:
-            log(f"ERROR fetching Arabic URL: {e}")
-            
-    progress_bar.progress(60)
-    
-    # 3. Merge Data
-    log("Merging Data...")
-    df = merge_data(data_en, data_ar)
-    
-    metric_items.metric("Total Items Found", str(len(df)))
-    
-    excel_path = os.path.join(session_id, "menu_data.xlsx")
-    df.to_excel(excel_path, index=False)
-    st.session_state.excel_path = excel_path
-    st.session_state.menu_df = df
-    
-    progress_bar.progress(70)
-    
-    # 4. Download Images
-    if download_images and not df.empty and 'originalImage' in df.columns:
+            log(f"ERROR fetching {label} URL: {e}")
+        return process_menu_data(None)
+
+    # 2. Download Images for the English items (the only source of image URLs)
+    async def download_all(session, items, fetch_ar):
         log(f"Downloading Images in batches of {batch_size}...")
-        total_images = len(df)
         downloaded_count = 0
         
-        # Prepare list of tasks
-        tasks = []
-        for i, row in df.iterrows():
-            img_url = row['originalImage']
-            if img_url and pd.notna(img_url):
-                product_name = row.get('name_en') or row.get('name_ar') or f"item_{i}"
-                safe_product_name = "".join([c for c in str(product_name) if c.isalpha() or c.isdigit() or c in "._- "]).strip()
-                item_id = row.get('id', i)
-                
-                if name_format == "Product Name":
-                    custom_name = safe_product_name
-                elif name_format == "ID + Product Name":
-                    custom_name = f"{item_id}_{safe_product_name}"
-                else:
-                    custom_name = f"item_{item_id}"
-                
-                tasks.append((img_url, images_dir, "", custom_name))
+        # Prepare list of tasks with column-wise operations instead of iterrows
+        # Keep only rows with an image URL so names are built for those rows alone
+        items = items[items['originalImage'].notna() & (items['originalImage'] != '')]
+        product_names = items['name'].replace('', pd.NA)
+        if name_format != "ID Only" and fetch_ar and product_names.isna().any():
+            # Fall back to Arabic names, which is the only reason to wait for that page
+            items_ar = await fetch_ar
+            names_ar = items_ar.drop_duplicates('id').set_index('id')['name'].replace('', pd.NA)
+            product_names = product_names.fillna(items['id'].map(names_ar))
+        fallback_names = pd.Series('item_' + items.index.astype(str), index=items.index)
+        product_names = product_names.fillna(fallback_names)
+        safe_product_names = product_names.astype(str).str.replace(UNSAFE_FILENAME_CHARS, '', regex=True).str.strip()
+        item_ids = items['id'].astype(str)
+        
+        if name_format == "Product Name":
+            custom_names = safe_product_names
+        elif name_format == "ID + Product Name":
+            custom_names = item_ids + "_" + safe_product_names
+        else:
+            custom_names = "item_" + item_ids
+        
+        # Sanitize the complete name the same way download_image_async does, so that
+        # deduplication sees the final filenames; names that end up empty fall back
+        # to item_<row> instead of the URL basename.
+        custom_names = custom_names.str.replace(UNSAFE_FILENAME_CHARS, '', regex=True).str.strip()
+        custom_names = custom_names.mask(custom_names == '', fallback_names)
+        
+        tasks = list(zip(
+            items['originalImage'],
+            itertools.repeat(images_dir),
+            itertools.repeat(""),
+            make_unique_names(custom_names),
+        ))
         
-        # Execute batch downloads
         completed = 0
-        with ThreadPoolExecutor(max_workers=batch_size) as executor:
-            futures = [executor.submit(download_image, t[0], t[1], t[2], t[3]) for t in tasks]
-            for future in as_completed(futures):
-                path = future.result()
-                if path:
-                    downloaded_count += 1
-                
-                completed += 1
-                metric_images.metric("Images Downloaded", f"{downloaded_count} / {len(tasks)}")
-                metric_time.metric("Elapsed Time", f"{int(time.time() - start_time)}s")
-                
-                if completed % batch_size == 0 or completed == len(tasks):
-                    log(f"Progress: {completed}/{len(tasks)} tasks processed...")
-                
-                current_progress = 70 + int((completed / max(1, len(tasks))) * 30)
-                progress_bar.progress(min(current_progress, 99))
+        # Queue downloads behind a semaphore rather than the connection pool, so time
+        # spent waiting for a free slot never counts toward aiohttp's request timeout.
+        semaphore = asyncio.Semaphore(batch_size)
+
+        async def download_one(task):
+            async with semaphore:
+                return await download_image_async(session, *task)
+
+        coros = [download_one(t) for t in tasks]
+        for future in asyncio.as_completed(coros):
+            path = await future
+            if path:
+                downloaded_count += 1
+            
+            completed += 1
+            metric_images.metric("Images Downloaded", f"{downloaded_count} / {len(tasks)}")
+            metric_time.metric("Elapsed Time", f"{int(time.time() - start_time)}s")
+            
+            if completed % batch_size == 0 or completed == len(tasks):
+                log(f"Progress: {completed}/{len(tasks)} tasks processed...")
+            
+            set_progress(min(70 + int((completed / max(1, len(tasks))) * 30), 99))
             
         log(f"Finished downloading {downloaded_count} images.")
+
+    # All network I/O shares one event loop: both pages are fetched concurrently and
+    # image downloads start as soon as the English menu is parsed, overlapping the
+    # Arabic fetch, the merge and the Excel export.
+    async def scrape_all():
+        data_en, data_ar = process_menu_data(None), process_menu_data(None)
+        connector = aiohttp.TCPConnector(limit=batch_size, limit_per_host=batch_size)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            fetch_en = asyncio.create_task(fetch_menu(url_en, "English")) if scrape_en else None
+            fetch_ar = asyncio.create_task(fetch_menu(url_ar, "Arabic")) if scrape_ar else None
+            downloads = None
+            
+            if fetch_en:
+                data_en = await fetch_en
+                set_progress(30)
+                if download_images and not data_en.empty:
+                    downloads = asyncio.create_task(download_all(session, data_en, fetch_ar))
+            
+            if fetch_ar:
+                data_ar = await fetch_ar
+            set_progress(60)
+            
+            # 3. Merge Data
+            log("Merging Data...")
+            df = merge_data(data_en, data_ar)
+            
+            metric_items.metric("Total Items Found", str(len(df)))
+            
+            excel_path = os.path.join(session_id, "menu_data.xlsx")
+            save_excel(df, excel_path)
+            st.session_state.excel_path = excel_path
+            st.session_state.menu_df = df
+            
+            set_progress(70)
+            
+            if downloads:
+                await downloads
+
+    asyncio.run(scrape_all())
     
     progress_bar.progress(100)
     metric_time.metric("Elapsed Time", f"{int(time.time() - start_time)}s")
     log("Done! Ready for download.")
     
-    zip_base_name = f"{session_id}_download"
-    shutil.make_archive(zip_base_name, 'zip', session_id)
-    st.session_state.zip_path = f"{zip_base_name}.zip"
+    # The zip itself is built lazily when the user downloads it
+    st.session_state.zip_path = f"{session_id}_download.zip"
 
     st.session_state.data_processed = True
 
+def build_zip_data(session_id, zip_path, excel_path):
+    """Returns the zip of the session folder, rebuilding it only if the Excel file is newer."""
+    if not os.path.exists(zip_path) or os.path.getmtime(zip_path) <= os.path.getmtime(excel_path):
+        # Build next to the target and swap it in, so a failed or concurrent build
+        # never leaves a broken zip that looks newer than the Excel file.
+        fd, tmp_path = tempfile.mkstemp(suffix=".zip.tmp", dir=os.path.dirname(zip_path))
+        os.close(fd)
+        try:
+            make_zip(session_id, tmp_path)
+            os.replace(tmp_path, zip_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    with open(zip_path, "rb") as f:
+        return f.read()
+
 if st.button("Start Scraping", use_container_width=True, type="primary"):
     run_scraper()
 
@@ -215,14 +272,9 @@ if st.session_state.data_processed:
     
     if not edited_df.equals(st.session_state.menu_df):
         st.session_state.menu_df = edited_df
-        edited_df.to_excel(st.session_state.excel_path, index=False)
-        
-        session_id = st.session_state.session_id
-        zip_base_name = f"{session_id}_download"
-        shutil.make_archive(zip_base_name, 'zip', session_id)
-        
-        # We implicitly re-render because we've updated the zip archie right here.
-        # But to be safe, we will just continue cleanly.
+        # Only the Excel file is rewritten here; the zip notices the newer
+        # Excel file and rebuilds itself the next time it is downloaded.
+        save_excel(edited_df, st.session_state.excel_path)
 
     st.subheader("Downloads")
     st.success(f"Scraping completed. Data saved to: {st.session_state.session_id}")
@@ -235,7 +287,7 @@ if st.session_state.data_processed:
             excel_data = f.read()
             col_d1.download_button("Download Excel", data=excel_data, file_name="menu_data.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
 
-    if st.session_state.zip_path and os.path.exists(st.session_state.zip_path):
-        with open(st.session_state.zip_path, "rb") as f:
-            zip_data = f.read()
-            col_d2.download_button("Download Full Menu (Zip)", data=zip_data, file_name="full_menu.zip", mime="application/zip", use_container_width=True)
+    if st.session_state.zip_path and os.path.exists(st.session_state.session_id):
+        # Passing a callable defers zipping until the button is actually clicked
+        session_id, zip_path, excel_path = st.session_state.session_id, st.session_state.zip_path, st.session_state.excel_path
+        col_d2.download_button("Download Full Menu (Zip)", data=lambda: build_zip_data(session_id, zip_path, excel_path), file_name="full_menu.zip", mime="application/zip", use_container_width=True)
@@ -1,17 +1,59 @@
 import requests
+from requests.adapters import HTTPAdapter
+from http.cookiejar import DefaultCookiePolicy
 import json
 import re
 import os
-import time
+import datetime
+import zipfile
 import pandas as pd
+import openpyxl
+import aiofiles
 from tenacity import retry, stop_after_attempt, wait_fixed
-import mimetypes
 from urllib.parse import urlparse
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 }
 
+# Shared session so repeated page fetches reuse pooled keep-alive connections
+# instead of paying a fresh TCP/TLS handshake per request. Cookies are never
+# stored, so one fetch (or one user's scrape) can't affect another's response.
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_SESSION.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+_SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+MENU_COLUMNS = [
+    'id', 'name', 'description', 'price',
+    'originalSection', 'image', 'originalImage', 'sectionName'
+]
+
+# Anything other than letters, digits and "._- " is stripped from filenames.
+# \w is Unicode-aware here, so Arabic names survive sanitizing.
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.\- ]')
+
+# 64 KiB keeps the number of read/write round trips per image small
+IMAGE_CHUNK_SIZE = 64 * 1024
+# Chunks are buffered up to this size before each disk write
+IMAGE_WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Already-compressed formats that are stored, not deflated, when zipping
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif'}
+
+# Extensions for image responses whose URL has none; anything else falls back to .jpg
+_EXT_MAP = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+    'image/avif': '.avif',
+    'image/svg+xml': '.svg',
+}
+
+_MENU_DATA_RE = re.compile(r'"?menuData"?\s*:\s*({)')
+
 @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
 def fetch_html(url, proxy=None):
     """Fetches HTML content from a URL, optionally using a proxy."""
@@ -23,7 +65,7 @@ def fetch_html(url, proxy=None):
         }
     
     try:
-        response = requests.get(url, headers=HEADERS, proxies=proxies, timeout=10)
+        response = _SESSION.get(url, proxies=proxies, timeout=10)
         response.raise_for_status()
         return response.text
     except requests.RequestException as e:
@@ -46,58 +88,57 @@ def extract_menu_data(html_content):
     # Often in these sites it's in window.__DATA__ or similar.
     # Let's try a regex that captures the JSON object assuming it's part of a larger structure
     # We will look for the specific key and then try to parse the object.
+    # The regex already sees script contents, so no DOM walk is needed. If one is ever
+    # added (e.g. for escaped state blobs), use lxml.html.fromstring + an XPath such as
+    # //script[contains(text(), "menuData")]/text() rather than BeautifulSoup's html.parser.
     
-    match = re.search(r'"menuData"\s*:\s*({)', html_content)
-    if not match:
-        # Fallback: maybe it's not quoted?
-        match = re.search(r'menuData\s*:\s*({)', html_content)
-    
-    if match:
-        start_index = match.start(1)
-        # We need to find the matching closing brace.
-        # This is a simple parser to find the end of the JSON object.
-        brace_count = 0
-        for i, char in enumerate(html_content[start_index:]):
-            if char == '{':
-                brace_count += 1
-            elif char == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    json_str = html_content[start_index : start_index + i + 1]
-                    try:
-                        return json.loads(json_str)
-                    except json.JSONDecodeError:
-                        print("Failed to parse extracted JSON string.")
-                        return None
-        print("Could not find closing brace for menuData.")
-        return None
+    # Quoted and unquoted keys share one pattern so the page is scanned once.
+    # Quoted JSON keys are preferred; unquoted (inline JS) hits are only tried
+    # if no quoted candidate parses.
+    decoder = json.JSONDecoder()
+    unquoted_starts = []
+    found = False
+    for match in _MENU_DATA_RE.finditer(html_content):
+        found = True
+        if not match.group(0).startswith('"'):
+            unquoted_starts.append(match.start(1))
+            continue
+        menu_data = _decode_object(decoder, html_content, match.start(1))
+        if menu_data is not None:
+            return menu_data
+    
+    for start_index in unquoted_starts:
+        menu_data = _decode_object(decoder, html_content, start_index)
+        if menu_data is not None:
+            return menu_data
     
-    print("Could not find 'menuData' in HTML.")
+    if found:
+        print("Failed to parse extracted JSON string.")
+    else:
+        print("Could not find 'menuData' in HTML.")
     return None
 
+def _decode_object(decoder, html_content, start_index):
+    """Parses the JSON object starting at start_index, or returns None if it is not valid JSON."""
+    # raw_decode parses the object in C and stops at its closing brace,
+    # so there is no need to scan for the matching brace ourselves.
+    try:
+        menu_data, _ = decoder.raw_decode(html_content, start_index)
+        return menu_data
+    except json.JSONDecodeError:
+        return None
+
 def process_menu_data(menu_data):
-    """Parses the menuData dictionary into a flat list of items."""
+    """Parses the menuData dictionary into a DataFrame with one row per item."""
     if not menu_data or 'items' not in menu_data:
-        return []
-    
-    items = []
-    for item in menu_data['items']:
-        # Extract relevant fields
-        processed_item = {
-            'id': item.get('id'),
-            'name': item.get('name'),
-            'description': item.get('description'),
-            'price': item.get('price'),
-            'originalSection': item.get('originalSection'),
-            'image': item.get('image'), # Thumbnail?
-            'originalImage': item.get('originalImage'), # Full size
-            'sectionName': item.get('sectionName')
-        }
-        items.append(processed_item)
-    return items
+        return pd.DataFrame(columns=MENU_COLUMNS)
+    
+    # Project the relevant fields straight from the item dicts;
+    # 'image' is the thumbnail, 'originalImage' the full size.
+    return pd.DataFrame.from_records(menu_data['items'], columns=MENU_COLUMNS)
 
-def download_image(url, save_dir, filename_prefix="", custom_filename=None):
-    """Downloads an image and saves it to the specified directory."""
+async def download_image_async(session, url, save_dir, filename_prefix="", custom_filename=None):
+    """Downloads an image over a shared aiohttp session and saves it to the specified directory."""
     if not url:
         return None
     
@@ -105,55 +146,66 @@ def download_image(url, save_dir, filename_prefix="", custom_filename=None):
     clean_url = url.split('?')[0]
     
     try:
-        response = requests.get(url, headers=HEADERS, stream=True)
-        response.raise_for_status()
-        
-        # Determine extension
-        ext = os.path.splitext(clean_url)[1]
-        if not ext:
+        async with session.get(url, headers=HEADERS) as response:
+            response.raise_for_status()
             content_type = response.headers.get('Content-Type')
-            if content_type:
-                ext = mimetypes.guess_extension(content_type)
         
-        if not ext:
-            ext = ".jpg" # Default fallback
+            # Determine extension
+            ext = os.path.splitext(clean_url)[1]
+            if not ext and content_type:
+                ext = _EXT_MAP.get(content_type.split(';')[0].strip().lower())
+        
+            if not ext:
+                ext = ".jpg" # Default fallback
             
-        if custom_filename:
-            # Sanitize custom filename
-            safe_name = "".join([c for c in custom_filename if c.isalpha() or c.isdigit() or c in "._- "]).strip()
-            filename = f"{safe_name}{ext}"
-        else:
-            filename = f"{filename_prefix}{os.path.basename(clean_url)}"
-            # Ensure filename is safe
-            filename = "".join([c for c in filename if c.isalpha() or c.isdigit() or c in "._- "]).strip()
+            if custom_filename:
+                # Sanitize custom filename
+                safe_name = UNSAFE_FILENAME_CHARS.sub('', custom_filename).strip()
+                filename = f"{safe_name}{ext}"
+            else:
+                filename = f"{filename_prefix}{os.path.basename(clean_url)}"
+                # Ensure filename is safe
+                filename = UNSAFE_FILENAME_CHARS.sub('', filename).strip()
             
-        save_path = os.path.join(save_dir, filename)
+            save_path = os.path.join(save_dir, filename)
         
-        # Handle duplicates if using custom filename
-        if custom_filename and os.path.exists(save_path):
-            base, extension = os.path.splitext(filename)
-            counter = 1
-            while os.path.exists(save_path):
-                save_path = os.path.join(save_dir, f"{base}_{counter}{extension}")
-                counter += 1
-        elif os.path.exists(save_path):
-             return save_path # Skip if exists (only for non-custom names where we assume URL is unique ID)
-
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(1024):
-                f.write(chunk)
-        time.sleep(0.5) # Rate limiting
+            # Custom filenames are expected to be unique already (see make_unique_names),
+            # so open exclusively instead of probing the disk for a free name.
+            if custom_filename:
+                mode = 'xb'
+            elif os.path.exists(save_path):
+                return save_path # Skip if exists (only for non-custom names where we assume URL is unique ID)
+            else:
+                mode = 'wb'
+
+            # Stream the body in large chunks, but coalesce them so a typical image
+            # reaches disk in a single write (one executor hop, one syscall).
+            async with aiofiles.open(save_path, mode) as f:
+                pending = bytearray()
+                async for chunk in response.content.iter_chunked(IMAGE_CHUNK_SIZE):
+                    pending += chunk
+                    if len(pending) >= IMAGE_WRITE_BUFFER_SIZE:
+                        await f.write(pending)
+                        pending.clear()
+                if pending:
+                    await f.write(pending)
         return save_path
     except Exception as e:
-        print(f"Failed to download image {url}: {e}")
+        print(f"Failed to download image {url}: {e!r}")
         return None
 
-def merge_data(english_items, arabic_items):
-    """Merges English and Arabic item lists into a DataFrame."""
-    # Convert to DataFrames
-    df_en = pd.DataFrame(english_items)
-    df_ar = pd.DataFrame(arabic_items)
-    
+def make_unique_names(names):
+    """Appends _1, _2, ... to repeated names in a Series so every name is unique (case-insensitively)."""
+    names = names.astype(str)
+    while True:
+        # Repeat until suffixed names no longer clash with names that already ended in _N
+        repeat_count = names.groupby(names.str.lower()).cumcount()
+        if not repeat_count.any():
+            return names
+        names = names.where(repeat_count == 0, names + "_" + repeat_count.astype(str))
+
+def merge_data(df_en, df_ar):
+    """Merges English and Arabic item DataFrames into a single DataFrame."""
     # Rename columns for clarity before merge
     df_en = df_en.rename(columns={
         'name': 'name_en',
@@ -174,7 +226,9 @@ def merge_data(english_items, arabic_items):
     # But ID is safer.
     
     if 'id' in df_en.columns and 'id' in df_ar.columns:
-        merged_df = pd.merge(df_en, df_ar[['id', 'name_ar', 'description_ar', 'section_ar']], on='id', how='outer')
+        # Align on an 'id' index; join reuses the index hash tables instead of building new ones
+        df_ar = df_ar[['id', 'name_ar', 'description_ar', 'section_ar']].set_index('id')
+        merged_df = df_en.set_index('id').join(df_ar, how='outer', sort=False).reset_index()
     else:
         # Fallback: concat if IDs missing (unlikely for API data)
         print("Warning: IDs missing, merging by index.")
@@ -197,3 +251,31 @@ def merge_data(english_items, arabic_items):
     final_columns = [c for c in final_columns if c in merged_df.columns]
     
     return merged_df[final_columns]
+
+def save_excel(df, path):
+    """Writes a DataFrame to an .xlsx file using openpyxl's write-only mode."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append([str(c) for c in df.columns])
+    # Missing values become empty cells, matching DataFrame.to_excel
+    rows = df.astype(object).where(df.notna(), None)
+    for row in rows.itertuples(index=False, name=None):
+        ws.append([_excel_value(v) for v in row])
+    wb.save(path)
+
+def _excel_value(value):
+    """Passes scalars through and stringifies anything else (dicts, lists, ...) like to_excel does."""
+    if value is None or isinstance(value, (str, int, float, bool, datetime.date)):
+        return value
+    return str(value)
+
+def make_zip(src_dir, zip_path):
+    """Zips a scrape folder, storing images as-is and deflating everything else."""
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for root, _, files in os.walk(src_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                # JPEG/PNG/WebP are already compressed, deflating them only burns CPU
+                is_image = os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+                compress_type = zipfile.ZIP_STORED if is_image else zipfile.ZIP_DEFLATED
+                zf.write(path, arcname=os.path.relpath(path, src_dir), compress_type=compress_type)